@@ -5,6 +5,7 @@ from telegram.ext import (
 )
 from telegram.constants import ParseMode
 from telegram import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
+import asyncio
 import logging
 from datetime import datetime
 
@@ -13,16 +14,22 @@ import io
 import re
 
 from database import (
-    init_db, add_walk, get_current_balance,
-    set_initial_balance, record_payment, record_credit_given,
-    get_weekly_report_data, get_all_transactions_for_report,
-    get_transactions_with_ids, delete_transaction_by_id, get_transaction_count,
-    get_walk_rate, set_walk_rate, register_user, get_all_user_ids,
-    get_streak, get_walks_this_week, get_weekly_goal, set_weekly_goal,
-    get_user_reminder, set_user_reminder, get_earnings_forecast, update_walk_note,
+    iter_all_transactions_for_report,
+    add_walk_async, get_current_balance_async,
+    set_initial_balance_async, record_payment_async, record_credit_given_async,
+    get_scheduled_report_data_async,
+    get_transactions_with_ids_async, get_transaction_by_id_async, delete_transaction_by_id_async,
+    get_transaction_count_async,
+    get_walk_rate_async, set_walk_rate_async, register_user_async, get_all_user_ids_async,
+    get_walks_this_week_async, get_weekly_goal_async, set_weekly_goal_async,
+    get_user_reminder_async, set_user_reminder_async, get_balance_snapshot_async,
+    update_walk_note_async,
 )
 from config import YOUR_TELEGRAM_CHAT_ID, is_admin, ADMIN_CHAT_IDS
-from report_cleanup import clean_detailed_report, get_report_entries, get_recent_entries, clean_specific_entries
+from report_cleanup import (
+    clean_detailed_report_async, get_report_entries_async, get_recent_entries_async,
+    clean_specific_entries_async,
+)
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO
@@ -38,16 +45,65 @@ ASK_WALK_NOTE = 10
 CONFIRM_UNDO = 11
 ASK_REMINDER_TIME = 12
 
+# Static reply texts, built once at import instead of on every handler call
+WELCOME_TEXT = "Welcome to k9LogBot! Use the buttons below or commands to interact."
+HELP_TEXT = (
+    "*Available Commands:*\n"
+    "/addwalk — Log a walk\n"
+    "/balance — Balance, streak & weekly progress\n"
+    "/setgoal <n> — Set weekly walk goal\n"
+    "/setinitial <amount> — Set starting balance\n"
+    "/report — Detailed transaction report\n"
+    "/undo — Undo last transaction\n"
+    "/reminder HH:MM — Set daily reminder\n"
+    "/reminder off — Disable reminder\n"
+    "{admin_section}"
+    "Or use the buttons below."
+)
+ADMIN_HELP_SECTION = (
+    "\n*Admin Commands:*\n"
+    "/setrate <amount> — Change walk rate (now {rate:.0f} MDL)\n"
+    "/broadcast <msg> — Announce to all users\n"
+    "/export — Download transactions as CSV\n"
+)
+CREDIT_CANCELLED_TEXT = 'Operation "Give Credit" cancelled.'
+CASHOUT_CANCELLED_TEXT = 'Operation "Cash Out" cancelled.'
+NO_TRANSACTIONS_TEXT = (
+    "📊 *No Transactions Yet*\n\n"
+    "No walks or transactions recorded yet.\n"
+    "Start by adding a walk! 🐕"
+)
+
 # Keyboard Definitions (Admin gets cleanup button)
+_MAIN_BUTTONS = [
+    [KeyboardButton("➕ Add Walk"), KeyboardButton("💰 Current Balance")],
+    [KeyboardButton("📊 Detailed Report"), KeyboardButton("❓ Help")],
+    [KeyboardButton("💳 Give Credit"), KeyboardButton("💸 Cash Out")]
+]
+USER_KEYBOARD = ReplyKeyboardMarkup(_MAIN_BUTTONS, resize_keyboard=True)
+ADMIN_KEYBOARD = ReplyKeyboardMarkup(
+    _MAIN_BUTTONS + [[KeyboardButton("🗑️ Cleanup Detailed Report")]], resize_keyboard=True
+)
+
+CLEANUP_OPTIONS_TEXT = (
+    "🗑️ *Admin Cleanup Options*\n\n"
+    "Choose a cleanup option:\n"
+    "• Last Week: Delete entries from the past 7 days\n"
+    "• Last Month: Delete entries from the past 30 days\n"
+    "• Last 10 Entries: Delete the most recent 10 transactions\n"
+    "• Custom: Specify your own date range\n"
+    "• Cancel: Exit cleanup"
+)
+CLEANUP_OPTIONS_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📅 Last Week", callback_data="cleanup_preset_week")],
+    [InlineKeyboardButton("📆 Last Month", callback_data="cleanup_preset_month")],
+    [InlineKeyboardButton("📋 Last 10 Entries", callback_data="cleanup_preset_10")],
+    [InlineKeyboardButton("🎯 Custom Date Range", callback_data="cleanup_custom")],
+    [InlineKeyboardButton("❌ Cancel", callback_data="cleanup_cancel")]
+])
+
 def get_main_keyboard(chat_id):
-    buttons = [
-        [KeyboardButton("➕ Add Walk"), KeyboardButton("💰 Current Balance")],
-        [KeyboardButton("📊 Detailed Report"), KeyboardButton("❓ Help")],
-        [KeyboardButton("💳 Give Credit"), KeyboardButton("💸 Cash Out")]
-    ]
-    if is_admin(chat_id):
-        buttons.append([KeyboardButton("🗑️ Cleanup Detailed Report")])
-    return ReplyKeyboardMarkup(buttons, resize_keyboard=True)
+    return ADMIN_KEYBOARD if is_admin(chat_id) else USER_KEYBOARD
 
 def get_cashout_inline_keyboard(balance):
     return InlineKeyboardMarkup([
@@ -72,8 +128,8 @@ async def receive_credit_amount(update, context):
         if amount <= 0:
             await update.message.reply_text("Credit amount must be positive. Please try again.")
             return ASK_CREDIT_AMOUNT
-        record_credit_given(amount, f"Credit (advance) of {amount:.2f} MDL")
-        current_balance = get_current_balance()
+        await record_credit_given_async(amount, f"Credit (advance) of {amount:.2f} MDL")
+        current_balance = await get_current_balance_async()
         if global_oled_display:
             global_oled_display.show_notification(f"Credit: -{amount:.0f} MDL", 3)
         await update.message.reply_text(
@@ -92,11 +148,11 @@ async def receive_credit_amount(update, context):
         return ConversationHandler.END
 
 async def credit_cancel(update, context):
-    await update.message.reply_text('Operation "Give Credit" cancelled.', reply_markup=get_main_keyboard(update.effective_chat.id))
+    await update.message.reply_text(CREDIT_CANCELLED_TEXT, reply_markup=get_main_keyboard(update.effective_chat.id))
     return ConversationHandler.END
 
 async def cashout_start(update, context):
-    current_balance = get_current_balance()
+    current_balance = await get_current_balance_async()
     keyboard = get_cashout_inline_keyboard(current_balance)
     await update.message.reply_text(
         f"Current amount to be paid out: *{current_balance:.2f} MDL*.\n"
@@ -112,7 +168,7 @@ async def cashout_type_chosen(update, context):
     query = update.callback_query
     await query.answer()
     if query.data == "cashout_all":
-        current_balance = get_current_balance()
+        current_balance = await get_current_balance_async()
         if current_balance <= 0:
             await query.edit_message_text(
                 f"Balance: *{current_balance:.2f} MDL*. Nothing to pay out.",
@@ -120,8 +176,8 @@ async def cashout_type_chosen(update, context):
                 reply_markup=None
             )
             return ConversationHandler.END
-        record_payment(current_balance, "Full settlement")
-        new_balance = get_current_balance()
+        await record_payment_async(current_balance, "Full settlement")
+        new_balance = await get_current_balance_async()
         if global_oled_display:
             global_oled_display.show_notification(f"Paid Out: {current_balance:.0f}", 3)
         await query.edit_message_text(
@@ -144,8 +200,8 @@ async def receive_manual_cashout_amount(update, context):
         if amount <= 0:
             await update.message.reply_text("Amount must be greater than zero. Please try again.")
             return ASK_MANUAL_CASHOUT_AMOUNT
-        record_payment(amount, f"Manual cash out of {amount:.2f} MDL")
-        current_balance = get_current_balance()
+        await record_payment_async(amount, f"Manual cash out of {amount:.2f} MDL")
+        current_balance = await get_current_balance_async()
         if global_oled_display:
             global_oled_display.show_notification(f"Cash Out: {amount:.0f}", 3)
         await update.message.reply_text(
@@ -164,7 +220,7 @@ async def receive_manual_cashout_amount(update, context):
         return ConversationHandler.END
 
 async def cashout_cancel(update, context):
-    await update.message.reply_text('Operation "Cash Out" cancelled.', reply_markup=get_main_keyboard(update.effective_chat.id))
+    await update.message.reply_text(CASHOUT_CANCELLED_TEXT, reply_markup=get_main_keyboard(update.effective_chat.id))
     return ConversationHandler.END
 
 # --- Enhanced Detailed Report Command with Visual Improvements ---
@@ -174,21 +230,19 @@ async def detailed_report_command(update, context):
     admin_mode = is_admin(chat_id)
     
     # Get transactions with IDs for individual deletion
-    transactions = get_transactions_with_ids(limit=20)  # Show last 20 transactions
-    total_count = get_transaction_count()
+    transactions = await get_transactions_with_ids_async(limit=20)  # Show last 20 transactions
+    total_count = await get_transaction_count_async()
     
     if not transactions:
         await update.message.reply_text(
-            "📊 *No Transactions Yet*\n\n"
-            "No walks or transactions recorded yet.\n"
-            "Start by adding a walk! 🐕",
+            NO_TRANSACTIONS_TEXT,
             parse_mode=ParseMode.MARKDOWN,
             reply_markup=get_main_keyboard(chat_id)
         )
         return
     
     # Calculate statistics
-    current_balance = get_current_balance()
+    current_balance = await get_current_balance_async()
     
     walks = [t for t in transactions if t[3] == 'walk']
     payments = [t for t in transactions if t[3] == 'payment']
@@ -200,31 +254,33 @@ async def detailed_report_command(update, context):
     credit_total = sum([abs(t[2]) for t in credits])
     
     # Build enhanced report message
-    report_text = "📊 *Detailed Activity Report*\n"
-    report_text += f"📅 _Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}_\n\n"
-    
+    parts = [
+        "📊 *Detailed Activity Report*\n",
+        f"📅 _Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}_\n\n",
+    ]
+
     # Summary section with better formatting
-    report_text += "━━━━━━━━━━━━━━━━━━━━━━\n"
-    report_text += "💰 *BALANCE OVERVIEW*\n"
-    report_text += "━━━━━━━━━━━━━━━━━━━━━━\n"
-    report_text += f"Current Balance: *{current_balance:.2f} MDL*\n\n"
-    
-    report_text += "━━━━━━━━━━━━━━━━━━━━━━\n"
-    report_text += "📈 *STATISTICS*\n"
-    report_text += "━━━━━━━━━━━━━━━━━━━━━━\n"
-    report_text += f"🐕 Walks (shown): *{walk_count}*\n"
-    report_text += f"💵 Earned (shown): *{walk_total:.2f} MDL*\n"
+    parts.append("━━━━━━━━━━━━━━━━━━━━━━\n")
+    parts.append("💰 *BALANCE OVERVIEW*\n")
+    parts.append("━━━━━━━━━━━━━━━━━━━━━━\n")
+    parts.append(f"Current Balance: *{current_balance:.2f} MDL*\n\n")
+
+    parts.append("━━━━━━━━━━━━━━━━━━━━━━\n")
+    parts.append("📈 *STATISTICS*\n")
+    parts.append("━━━━━━━━━━━━━━━━━━━━━━\n")
+    parts.append(f"🐕 Walks (shown): *{walk_count}*\n")
+    parts.append(f"💵 Earned (shown): *{walk_total:.2f} MDL*\n")
     if payments:
-        report_text += f"💸 Payments (shown): *{payment_total:.2f} MDL*\n"
+        parts.append(f"💸 Payments (shown): *{payment_total:.2f} MDL*\n")
     if credits:
-        report_text += f"💳 Credits (shown): *{credit_total:.2f} MDL*\n"
-    report_text += f"\n📋 Total records in DB: *{total_count}*\n"
-    
+        parts.append(f"💳 Credits (shown): *{credit_total:.2f} MDL*\n")
+    parts.append(f"\n📋 Total records in DB: *{total_count}*\n")
+
     # Recent transactions section
-    report_text += "\n━━━━━━━━━━━━━━━━━━━━━━\n"
-    report_text += "📝 *RECENT TRANSACTIONS*\n"
-    report_text += "━━━━━━━━━━━━━━━━━━━━━━\n"
-    
+    parts.append("\n━━━━━━━━━━━━━━━━━━━━━━\n")
+    parts.append("📝 *RECENT TRANSACTIONS*\n")
+    parts.append("━━━━━━━━━━━━━━━━━━━━━━\n")
+
     # Format each transaction with emoji based on type
     transaction_lines = []
     for t in transactions[:15]:  # Show 15 most recent in summary
@@ -247,8 +303,9 @@ async def detailed_report_command(update, context):
             amount = abs(amount)
         elif ttype == 'initial_balance':
             emoji = "💰"
-            sign = "+"
+            sign = "+" if amount >= 0 else "-"
             display_type = "Initial"
+            amount = abs(amount)
         else:
             emoji = "📝"
             sign = "+"
@@ -258,10 +315,12 @@ async def detailed_report_command(update, context):
             f"{emoji} `{tid}` | {date_str} | {sign}{amount:.2f} MDL ({display_type})"
         )
     
-    report_text += "\n".join(transaction_lines)
+    parts.append("\n".join(transaction_lines))
     
     if len(transactions) > 15:
-        report_text += f"\n_... and {len(transactions) - 15} more transactions_"
+        parts.append(f"\n_... and {len(transactions) - 15} more transactions_")
+
+    report_text = "".join(parts)
     
     # Send the main report
     await update.message.reply_text(
@@ -332,30 +391,14 @@ async def cleanup_start_callback(update, context):
     # Clear any previous data
     context.user_data.clear()
     
-    # Show preset cleanup options
-    keyboard = [
-        [InlineKeyboardButton("📅 Last Week", callback_data="cleanup_preset_week")],
-        [InlineKeyboardButton("📆 Last Month", callback_data="cleanup_preset_month")],
-        [InlineKeyboardButton("📋 Last 10 Entries", callback_data="cleanup_preset_10")],
-        [InlineKeyboardButton("🎯 Custom Date Range", callback_data="cleanup_custom")],
-        [InlineKeyboardButton("❌ Cancel", callback_data="cleanup_cancel")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    message = (
-        "🗑️ *Admin Cleanup Options*\n\n"
-        "Choose a cleanup option:\n"
-        "• Last Week: Delete entries from the past 7 days\n"
-        "• Last Month: Delete entries from the past 30 days\n"
-        "• Last 10 Entries: Delete the most recent 10 transactions\n"
-        "• Custom: Specify your own date range\n"
-        "• Cancel: Exit cleanup"
-    )
-    
     if query:
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await query.edit_message_text(
+            CLEANUP_OPTIONS_TEXT, reply_markup=CLEANUP_OPTIONS_KEYBOARD, parse_mode=ParseMode.MARKDOWN
+        )
     else:
-        await update.message.reply_text(message, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+        await update.message.reply_text(
+            CLEANUP_OPTIONS_TEXT, reply_markup=CLEANUP_OPTIONS_KEYBOARD, parse_mode=ParseMode.MARKDOWN
+        )
     
     return ASK_CLEANUP_OPTION
 
@@ -411,7 +454,7 @@ async def show_last_entries_preview(update, context, count):
     
     try:
         # Get last N transactions
-        entries = get_recent_entries(count)
+        entries = await get_recent_entries_async(count)
         if not entries:
             await query.edit_message_text("No entries found to cleanup.")
             return ConversationHandler.END
@@ -466,7 +509,7 @@ async def show_cleanup_preview(update, context):
     cleanup_type = context.user_data["cleanup_type"]
     
     try:
-        entries = get_report_entries(from_date, to_date)
+        entries = await get_report_entries_async(from_date, to_date)
         if not entries:
             await query.edit_message_text(
                 f"No entries found for {cleanup_type} ({from_date} to {to_date})."
@@ -604,7 +647,7 @@ async def show_cleanup_preview_text(update, context):
     cleanup_type = context.user_data["cleanup_type"]
     
     try:
-        entries = get_report_entries(from_date, to_date)
+        entries = await get_report_entries_async(from_date, to_date)
         if not entries:
             await update.message.reply_text(
                 f"No entries found for {cleanup_type} ({from_date} to {to_date}).\n"
@@ -680,7 +723,7 @@ async def cleanup_confirm(update, context):
                     return ConversationHandler.END
                 
                 # Delete entries by ID (this will need a new function in report_cleanup.py)
-                result = clean_specific_entries([e["id"] for e in entries if "id" in e])
+                result = await clean_specific_entries_async([e["id"] for e in entries if "id" in e])
                 deleted_count = len(entries)
                 walks_deleted = len([e for e in entries if e["type"] == "walk"])
                 
@@ -698,7 +741,7 @@ async def cleanup_confirm(update, context):
                 to_date = context.user_data["cleanup_end_date"]
                 cleanup_type = context.user_data.get("cleanup_type", "Date Range")
                 
-                result = clean_detailed_report(from_date, to_date)
+                result = await clean_detailed_report_async(from_date, to_date)
                 if result["success"]:
                     walk_count = context.user_data.get("cleanup_walk_count", 0)
                     total_entries = context.user_data.get("cleanup_total_entries", result["deleted_count"])
@@ -726,9 +769,9 @@ async def cleanup_confirm(update, context):
 # --- Other Standard Commands ---
 async def start(update, context):
     user = update.effective_user
-    register_user(user.id, user.username or user.first_name)
+    await register_user_async(user.id, user.username or user.first_name)
     await update.message.reply_text(
-        "Welcome to k9LogBot! Use the buttons below or commands to interact.",
+        WELCOME_TEXT,
         reply_markup=get_main_keyboard(update.effective_chat.id)
     )
 
@@ -736,24 +779,9 @@ async def help_command(update, context):
     chat_id = update.effective_chat.id
     admin_section = ""
     if is_admin(chat_id):
-        admin_section = (
-            "\n*Admin Commands:*\n"
-            f"/setrate <amount> — Change walk rate (now {get_walk_rate():.0f} MDL)\n"
-            "/broadcast <msg> — Announce to all users\n"
-            "/export — Download transactions as CSV\n"
-        )
+        admin_section = ADMIN_HELP_SECTION.format(rate=await get_walk_rate_async())
     await update.message.reply_text(
-        "*Available Commands:*\n"
-        "/addwalk — Log a walk\n"
-        "/balance — Balance, streak & weekly progress\n"
-        "/setgoal <n> — Set weekly walk goal\n"
-        "/setinitial <amount> — Set starting balance\n"
-        "/report — Detailed transaction report\n"
-        "/undo — Undo last transaction\n"
-        "/reminder HH:MM — Set daily reminder\n"
-        "/reminder off — Disable reminder\n"
-        f"{admin_section}"
-        "Or use the buttons below.",
+        HELP_TEXT.format(admin_section=admin_section),
         parse_mode=ParseMode.MARKDOWN,
         reply_markup=get_main_keyboard(chat_id)
     )
@@ -761,8 +789,8 @@ async def help_command(update, context):
 async def add_walk_command(update, context):
     if global_stats_manager:
         global_stats_manager.record_activity()
-    walk_id, rate = add_walk()
-    current_balance = get_current_balance()
+    walk_id, rate = await add_walk_async()
+    current_balance = await get_current_balance_async()
     note_keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("✏️ Add Note", callback_data=f"add_note_{walk_id}")]
     ])
@@ -774,11 +802,12 @@ async def add_walk_command(update, context):
 
 async def balance_command(update, context):
     chat_id = update.effective_chat.id
-    current_balance = get_current_balance()
-    streak = get_streak()
-    walks_week = get_walks_this_week()
-    goal = get_weekly_goal(chat_id)
-    forecast = get_earnings_forecast()
+    snapshot = await get_balance_snapshot_async(chat_id)
+    current_balance = snapshot['current_balance']
+    streak = snapshot['streak']
+    walks_week = snapshot['walks_week']
+    goal = snapshot['goal']
+    forecast = snapshot['forecast']
 
     msg = f"💰 *Balance: {current_balance:.2f} MDL*\n\n"
     if streak > 0:
@@ -809,7 +838,7 @@ async def receive_initial_balance(update, context):
         return
     try:
         amount = float(update.message.text)
-        set_initial_balance(amount)
+        await set_initial_balance_async(amount)
         await update.message.reply_text(
             f"Initial balance set to *{amount:.2f} MDL*.",
             parse_mode=ParseMode.MARKDOWN,
@@ -845,12 +874,7 @@ async def delete_single_transaction_callback(update, context):
     context.user_data["delete_transaction_id"] = transaction_id
     
     # Get transaction details for confirmation message
-    transactions = get_transactions_with_ids(limit=100)
-    transaction = None
-    for t in transactions:
-        if t[0] == transaction_id:
-            transaction = t
-            break
+    transaction = await get_transaction_by_id_async(transaction_id)
     
     if not transaction:
         await query.answer("❌ Transaction not found", show_alert=True)
@@ -914,7 +938,7 @@ async def confirm_delete_transaction_callback(update, context):
         return
     
     # Perform deletion
-    result = delete_transaction_by_id(transaction_id)
+    result = await delete_transaction_by_id_async(transaction_id)
     
     if result["success"]:
         amount = result["amount"]
@@ -976,7 +1000,7 @@ async def show_more_transactions_callback(update, context):
     
     # Get more transactions (next batch)
     offset = context.user_data.get("transaction_offset", 10)
-    transactions = get_transactions_with_ids(limit=10, offset=offset)
+    transactions = await get_transactions_with_ids_async(limit=10, offset=offset)
     
     if not transactions:
         await query.answer("No more transactions", show_alert=True)
@@ -1040,8 +1064,9 @@ async def setrate_command(update, context):
         await update.message.reply_text("⛔ Admin only.")
         return
     if not context.args:
+        current_rate = await get_walk_rate_async()
         await update.message.reply_text(
-            f"Current walk rate: *{get_walk_rate():.2f} MDL*\nUsage: `/setrate <amount>`",
+            f"Current walk rate: *{current_rate:.2f} MDL*\nUsage: `/setrate <amount>`",
             parse_mode=ParseMode.MARKDOWN,
             reply_markup=get_main_keyboard(update.effective_chat.id)
         )
@@ -1051,7 +1076,7 @@ async def setrate_command(update, context):
         if rate <= 0:
             await update.message.reply_text("Rate must be positive.")
             return
-        set_walk_rate(rate)
+        await set_walk_rate_async(rate)
         await update.message.reply_text(
             f"✅ Walk rate updated to *{rate:.2f} MDL* per walk.",
             parse_mode=ParseMode.MARKDOWN,
@@ -1069,7 +1094,7 @@ async def broadcast_command(update, context):
         await update.message.reply_text("Usage: `/broadcast <message>`", parse_mode=ParseMode.MARKDOWN)
         return
     message = " ".join(context.args)
-    user_ids = get_all_user_ids()
+    user_ids = await get_all_user_ids_async()
     if not user_ids:
         await update.message.reply_text("No registered users yet.")
         return
@@ -1091,7 +1116,7 @@ async def broadcast_command(update, context):
 
 async def undo_command(update, context):
     """Show the last transaction with a confirmation button to delete it."""
-    transactions = get_transactions_with_ids(limit=1)
+    transactions = await get_transactions_with_ids_async(limit=1)
     if not transactions:
         await update.message.reply_text("No transactions to undo.")
         return
@@ -1119,11 +1144,11 @@ async def undo_callback(update, context):
         await query.edit_message_text("↩️ Undo cancelled.")
         return
     tid = int(query.data.replace("undo_confirm_", ""))
-    result = delete_transaction_by_id(tid)
+    result = await delete_transaction_by_id_async(tid)
     if result["success"]:
         if global_stats_manager:
             global_stats_manager.record_activity()
-        new_balance = get_current_balance()
+        new_balance = await get_current_balance_async()
         await query.edit_message_text(
             f"✅ *Transaction Undone*\n\nBalance: *{new_balance:.2f} MDL*",
             parse_mode=ParseMode.MARKDOWN
@@ -1131,26 +1156,32 @@ async def undo_callback(update, context):
     else:
         await query.edit_message_text(f"❌ Undo failed: {result.get('error', 'Unknown error')}")
 
+def _build_export_csv():
+    """Stream all transactions into CSV text. Returns (csv_text, row_count)."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Timestamp', 'Amount (MDL)', 'Type', 'Description', 'Notes'])
+    exported = 0
+    for row in iter_all_transactions_for_report():
+        writer.writerow(row)
+        exported += 1
+    return output.getvalue(), exported
+
 async def export_command(update, context):
     """Admin: export all transactions as a CSV file."""
     if not is_admin(update.effective_chat.id):
         await update.message.reply_text("⛔ Admin only.")
         return
-    transactions = get_all_transactions_for_report()
-    if not transactions:
+    # The query and CSV encoding both run off the event loop
+    csv_text, exported = await asyncio.to_thread(_build_export_csv)
+    if not exported:
         await update.message.reply_text("No transactions to export.")
         return
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Timestamp', 'Amount (MDL)', 'Type', 'Description', 'Notes'])
-    for row in transactions:
-        writer.writerow(row)
-    output.seek(0)
     filename = f"k9logbot_{datetime.now().strftime('%Y%m%d')}.csv"
     await update.message.reply_document(
-        document=io.BytesIO(output.getvalue().encode('utf-8')),
+        document=io.BytesIO(csv_text.encode('utf-8')),
         filename=filename,
-        caption=f"📊 Exported {len(transactions)} transactions",
+        caption=f"📊 Exported {exported} transactions",
         reply_markup=get_main_keyboard(update.effective_chat.id)
     )
 
@@ -1158,8 +1189,8 @@ async def setgoal_command(update, context):
     """Set or view the weekly walk goal."""
     user_id = update.effective_chat.id
     if not context.args:
-        goal = get_weekly_goal(user_id)
-        walks = get_walks_this_week()
+        goal = await get_weekly_goal_async(user_id)
+        walks = await get_walks_this_week_async()
         if goal > 0:
             await update.message.reply_text(
                 f"🎯 Weekly goal: *{goal} walks* | Progress: *{walks}/{goal}*\n"
@@ -1179,7 +1210,7 @@ async def setgoal_command(update, context):
         if goal <= 0:
             await update.message.reply_text("Goal must be a positive number.")
             return
-        set_weekly_goal(user_id, goal)
+        await set_weekly_goal_async(user_id, goal)
         await update.message.reply_text(
             f"🎯 Weekly goal set to *{goal} walks*!",
             parse_mode=ParseMode.MARKDOWN,
@@ -1192,7 +1223,7 @@ async def reminder_command(update, context):
     """Set or disable a daily reminder if no walk has been logged."""
     user_id = update.effective_chat.id
     if not context.args:
-        current = get_user_reminder(user_id)
+        current = await get_user_reminder_async(user_id)
         if current['enabled']:
             await update.message.reply_text(
                 f"🔔 Reminder set for *{current['time']}*\nUse `/reminder off` to disable.",
@@ -1208,13 +1239,13 @@ async def reminder_command(update, context):
         return
     arg = context.args[0].strip()
     if arg.lower() == 'off':
-        set_user_reminder(user_id, None, False)
+        await set_user_reminder_async(user_id, None, False)
         await update.message.reply_text("🔕 Daily reminder disabled.", reply_markup=get_main_keyboard(user_id))
         return
     if re.match(r'^\d{2}:\d{2}$', arg):
         hour, minute = map(int, arg.split(':'))
         if 0 <= hour <= 23 and 0 <= minute <= 59:
-            set_user_reminder(user_id, arg, True)
+            await set_user_reminder_async(user_id, arg, True)
             await update.message.reply_text(
                 f"🔔 Reminder set for *{arg}* daily.\nYou'll be reminded if no walk is logged by then.",
                 parse_mode=ParseMode.MARKDOWN,
@@ -1239,7 +1270,7 @@ async def receive_walk_note(update, context):
     note = update.message.text.strip()
     walk_id = context.user_data.get("note_walk_id")
     if walk_id:
-        update_walk_note(walk_id, note)
+        await update_walk_note_async(walk_id, note)
     await update.message.reply_text(
         f"✅ Note saved: _{note}_",
         parse_mode=ParseMode.MARKDOWN,
@@ -1374,8 +1405,8 @@ def setup_handlers(application, stats_manager=None, oled_display=None):
 
 # Scheduled Report Function
 async def send_scheduled_report(bot_instance):
-    walk_count, walk_total_amount, total_payment_credit_amount = get_weekly_report_data()
-    current_balance = get_current_balance()
+    (walk_count, walk_total_amount,
+     total_payment_credit_amount, current_balance) = await get_scheduled_report_data_async()
 
     report_message = (
         f"*Weekly Report (Week ending {datetime.now().strftime('%Y-%m-%d')})*\n\n"
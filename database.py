@@ -1,70 +1,213 @@
 # database.py
+import asyncio
 import sqlite3
 import os
 import calendar
-from datetime import datetime
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from urllib.parse import quote
 
 # Database file path - using a data directory that can be mounted as a volume
 DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'k9_log.db')
 
+# Per-connection performance settings. journal_mode=WAL is persistent in the
+# database file, so it is set once when the writer connection is opened.
+_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',  # Balance between safety and performance (safe under WAL)
+    'PRAGMA temp_store=MEMORY',  # Use memory for temp tables
+    'PRAGMA mmap_size=268435456',  # 256MB memory map
+    'PRAGMA cache_size=-65536',  # Up to 64MB page cache
+    'PRAGMA foreign_keys=ON',
+)
+
+# Process-wide connections, opened lazily and reused for every call. Writes go
+# through the single writer connection; reads use a separate read-only
+# connection so that, under WAL, they never wait on a writer.
+_writer = None
+_writer_lock = threading.Lock()
+_reader = None
+_reader_lock = threading.Lock()
+
+# Write statements shared by the transaction functions
+_SQL_INSERT_TX = (
+    'INSERT INTO transactions (timestamp, amount, transaction_type, description, notes) '
+    'VALUES (?, ?, ?, ?, ?)'
+)
+_SQL_BALANCE_DELTA = 'UPDATE balance SET current_balance = current_balance + ? WHERE id = 1'
+
+# Timestamps are stored as INTEGER unix epoch seconds. Queries that hand rows to
+# the UI render them back to local ISO-8601 text with this expression.
+LOCAL_TIMESTAMP_SQL = "strftime('%Y-%m-%dT%H:%M:%S', timestamp, 'unixepoch', 'localtime')"
+
+# AUTOINCREMENT keeps ids from being reused after the newest row is deleted
+# (/undo, cleanup); ids are embedded in Telegram button callback data.
+_SQL_CREATE_TRANSACTIONS = '''
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        transaction_type TEXT NOT NULL,
+        description TEXT,
+        notes TEXT
+    )
+'''
+
+# Single-row lookup table, stored directly in its primary-key B-tree
+_SQL_CREATE_BALANCE = '''
+    CREATE TABLE IF NOT EXISTS balance (
+        id INTEGER PRIMARY KEY,
+        current_balance REAL NOT NULL DEFAULT 0.0
+    ) WITHOUT ROWID
+'''
+
+# Default TTL for get_dashboard_stats_cached (seconds); writes invalidate it immediately
+DASHBOARD_STATS_TTL = 5.0
+_dashboard_stats_cache = None
+_dashboard_stats_time = 0.0
+# Bumped by notify_data_changed(); a stats query only caches its result if no
+# write committed while it ran
+_data_generation = 0
+
+# Callbacks registered with subscribe(), run after each committed write
+_listeners = []
+
 def ensure_data_directory():
-    """Ensure the data directory exists."""
-    data_dir = os.path.dirname(DB_PATH)
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
-
-def get_db_connection():
-    """Get a database connection with performance optimizations."""
-    ensure_data_directory()
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-
-    # Performance optimizations for SQLite
-    conn.execute('PRAGMA journal_mode=WAL')  # Write-Ahead Logging for better concurrency
-    conn.execute('PRAGMA synchronous=NORMAL')  # Balance between safety and performance
-    conn.execute('PRAGMA temp_store=MEMORY')  # Use memory for temp tables
-    conn.execute('PRAGMA mmap_size=268435456')  # 256MB memory map
+    """Ensure the data directory exists. Called once at startup, before init_db()."""
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+
+def _now_iso():
+    """Current local time as an ISO-8601 string at second resolution."""
+    return datetime.now().isoformat(timespec='seconds')
+
+def _local_day_start(day):
+    """Unix epoch seconds of local midnight at the start of the given date."""
+    return int(datetime.combine(day, datetime.min.time()).timestamp())
+
+def _week_start():
+    """Epoch seconds of local midnight on Monday of the current ISO week."""
+    today = date.today()
+    return _local_day_start(date.fromordinal(today.toordinal() - today.weekday()))
+
+def subscribe(callback):
+    """Register a no-argument callback to run after every committed balance or
+    transaction change. Callbacks run on the writing thread and should be cheap."""
+    _listeners.append(callback)
+
+def notify_data_changed():
+    """Drop the memoized dashboard stats and notify subscribers.
 
+    Call this after the write has committed, so listeners read the new state.
+    """
+    global _dashboard_stats_cache, _data_generation
+    _data_generation += 1
+    _dashboard_stats_cache = None
+    for callback in _listeners:
+        callback()
+
+def get_db_connection(read_only=False):
+    """Open a new database connection with performance optimizations.
+
+    Connections run in autocommit mode; writers open explicit transactions.
+    """
+    if read_only:
+        conn = sqlite3.connect(
+            f"file:{quote(DB_PATH)}?mode=ro", uri=True,
+            check_same_thread=False, isolation_level=None
+        )
+    else:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+@contextmanager
+def writer_connection():
+    """Yield the shared writer connection inside a BEGIN IMMEDIATE transaction.
+
+    The write lock is taken up front, and the transaction commits on success
+    or rolls back if the block raises.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = get_db_connection()
+            # Write-Ahead Logging for better concurrency; persists in the file header
+            _writer.execute('PRAGMA journal_mode=WAL')
+        _writer.execute('BEGIN IMMEDIATE')
+        try:
+            yield _writer
+        except BaseException:
+            _writer.execute('ROLLBACK')
+            raise
+        _writer.execute('COMMIT')
+
+@contextmanager
+def reader_connection():
+    """Yield the shared read-only connection."""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            _reader = get_db_connection(read_only=True)
+        yield _reader
+
+def _rebuild_table(conn, table, create_sql, select_list):
+    """Recreate a table from create_sql, copying its rows through select_list.
+
+    SQLite cannot change column types or table options in place, so the old
+    table is renamed, the new one created and the rows copied across.
+    """
+    conn.execute(f'ALTER TABLE {table} RENAME TO {table}_old')
+    conn.execute(create_sql)
+    conn.execute(f'INSERT INTO {table} SELECT {select_list} FROM {table}_old')
+    conn.execute(f'DROP TABLE {table}_old')
+
 def init_db():
     """Initialize the database with required tables."""
-    ensure_data_directory()
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-
+    with writer_connection() as conn:
         # Create transactions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                amount REAL NOT NULL,
-                transaction_type TEXT NOT NULL,
-                description TEXT
-            )
-        ''')
+        conn.execute(_SQL_CREATE_TRANSACTIONS)
 
         # Add notes column to transactions if it doesn't exist
         try:
-            cursor.execute('ALTER TABLE transactions ADD COLUMN notes TEXT')
+            conn.execute('ALTER TABLE transactions ADD COLUMN notes TEXT')
         except Exception:
             pass  # Column already exists
 
-        # Create balance table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS balance (
-                id INTEGER PRIMARY KEY,
-                current_balance REAL NOT NULL DEFAULT 0.0
+        # Migrate older transactions tables: ISO-8601 TEXT timestamps become
+        # INTEGER epoch seconds (stored values are naive local time, hence the
+        # 'utc' modifier).
+        timestamp_type, = conn.execute(
+            "SELECT type FROM pragma_table_info('transactions') WHERE name = 'timestamp'"
+        ).fetchone()
+        if timestamp_type.upper() == 'TEXT':
+            _rebuild_table(
+                conn, 'transactions', _SQL_CREATE_TRANSACTIONS,
+                "id, CAST(strftime('%s', timestamp, 'utc') AS INTEGER), amount, "
+                "transaction_type, description, notes"
             )
-        ''')
+
+        # Create balance table
+        conn.execute(_SQL_CREATE_BALANCE)
+
+        # Migrate a rowid balance table to WITHOUT ROWID. Renaming the table
+        # would rewrite the balance trigger to point at the old copy, so the
+        # trigger is dropped first and recreated below.
+        table_sql, = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'balance'"
+        ).fetchone()
+        if 'WITHOUT ROWID' not in table_sql.upper():
+            conn.execute('DROP TRIGGER IF EXISTS tx_bal')
+            _rebuild_table(conn, 'balance', _SQL_CREATE_BALANCE, 'id, current_balance')
 
         # Initialize balance if it doesn't exist
-        cursor.execute('SELECT COUNT(*) FROM balance')
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('INSERT INTO balance (id, current_balance) VALUES (1, 0.0)')
+        if conn.execute('SELECT COUNT(*) FROM balance').fetchone()[0] == 0:
+            conn.execute('INSERT INTO balance (id, current_balance) VALUES (1, 0.0)')
 
         # Create settings table
-        cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS settings (
                 key TEXT PRIMARY KEY,
                 value TEXT NOT NULL
@@ -72,12 +215,12 @@ def init_db():
         ''')
 
         # Insert default walk rate if not present
-        cursor.execute('''
+        conn.execute('''
             INSERT OR IGNORE INTO settings (key, value) VALUES ('walk_rate', '75.0')
         ''')
 
         # Create users table for broadcast
-        cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS users (
                 user_id INTEGER PRIMARY KEY,
                 username TEXT,
@@ -86,7 +229,7 @@ def init_db():
         ''')
 
         # Create user_settings table
-        cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS user_settings (
                 user_id INTEGER PRIMARY KEY,
                 weekly_goal INTEGER DEFAULT 0,
@@ -96,62 +239,74 @@ def init_db():
         ''')
 
         # Create indexes for better query performance
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_transaction_type
-            ON transactions(transaction_type)
-        ''')
-        cursor.execute('''
+        conn.execute('''
             CREATE INDEX IF NOT EXISTS idx_timestamp
             ON transactions(timestamp)
         ''')
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_type_timestamp
-            ON transactions(transaction_type, timestamp)
+        # Covering index: per-type counts and sums over a time range are
+        # answered from the index alone, without visiting table rows
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_type_ts_amount
+            ON transactions(transaction_type, timestamp, amount)
+        ''')
+        # Superseded by idx_type_ts_amount (they are prefixes of it)
+        conn.execute('DROP INDEX IF EXISTS idx_transaction_type')
+        conn.execute('DROP INDEX IF EXISTS idx_type_timestamp')
+
+        # Keep the running balance in step with every inserted transaction
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS tx_bal AFTER INSERT ON transactions
+            BEGIN
+                UPDATE balance SET current_balance = current_balance + NEW.amount WHERE id = 1;
+            END
         ''')
-
-        conn.commit()
 
 # --- Settings ---
 
 def get_walk_rate():
     """Get the current walk rate from settings."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM settings WHERE key = 'walk_rate'")
-        row = cursor.fetchone()
+    with reader_connection() as conn:
+        row = conn.execute("SELECT value FROM settings WHERE key = 'walk_rate'").fetchone()
         return float(row[0]) if row else 75.0
 
 def set_walk_rate(amount):
     """Set the walk rate in settings."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
+    with writer_connection() as conn:
+        conn.execute(
             "INSERT OR REPLACE INTO settings (key, value) VALUES ('walk_rate', ?)",
             (str(float(amount)),)
         )
-        conn.commit()
 
 # --- Users ---
 
 def register_user(user_id, username=None):
     """Register a user (INSERT OR IGNORE)."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
+    with writer_connection() as conn:
+        conn.execute(
             "INSERT OR IGNORE INTO users (user_id, username, first_seen) VALUES (?, ?, ?)",
-            (user_id, username, datetime.now().isoformat())
+            (user_id, username, _now_iso())
         )
-        conn.commit()
 
 def get_all_user_ids():
     """Get all registered user IDs."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT user_id FROM users")
-        return [row[0] for row in cursor.fetchall()]
+    with reader_connection() as conn:
+        return [row[0] for row in conn.execute("SELECT user_id FROM users")]
 
 # --- Walk operations ---
 
+def _record_transaction(conn, amount, transaction_type, description, notes=None):
+    """Insert a signed transaction; the tx_bal trigger applies it to the balance.
+
+    Every transaction's amount is the exact delta it applied to the balance, so
+    deleting a row can always be undone by subtracting its amount.
+
+    Returns:
+        The new transaction id
+    """
+    return conn.execute(
+        _SQL_INSERT_TX, (int(time.time()), amount, transaction_type, description, notes)
+    ).lastrowid
+
 def add_walk(notes=None):
     """Add a dog walk transaction using the current walk rate.
 
@@ -159,123 +314,112 @@ def add_walk(notes=None):
         (walk_id, rate) tuple
     """
     rate = get_walk_rate()
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        timestamp = datetime.now().isoformat()
+    with writer_connection() as conn:
+        walk_id = _record_transaction(conn, rate, 'walk', 'Dog walk', notes)
 
-        cursor.execute('''
-            INSERT INTO transactions (timestamp, amount, transaction_type, description, notes)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (timestamp, rate, 'walk', 'Dog walk', notes))
+    notify_data_changed()
+    return walk_id, rate
 
-        walk_id = cursor.lastrowid
+def add_walks(entries):
+    """Bulk-insert walk transactions in one write transaction (backfill/import).
 
-        # Update balance
-        cursor.execute('UPDATE balance SET current_balance = current_balance + ? WHERE id = 1', (rate,))
-        conn.commit()
+    Args:
+        entries: Iterable of (timestamp, amount, notes) tuples, where timestamp
+            is unix epoch seconds and notes may be None
 
-    return walk_id, rate
+    Returns:
+        Number of walks inserted
+    """
+    rows = [(int(ts), amount, 'walk', 'Dog walk', notes) for ts, amount, notes in entries]
+    if not rows:
+        return 0
+    with writer_connection() as conn:
+        # The tx_bal trigger applies each amount inside the same statement loop
+        conn.executemany(_SQL_INSERT_TX, rows)
+
+    notify_data_changed()
+    return len(rows)
 
 def update_walk_note(transaction_id, note):
     """Update the note on an existing walk transaction."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
+    with writer_connection() as conn:
+        conn.execute(
             "UPDATE transactions SET notes = ? WHERE id = ?",
             (note, transaction_id)
         )
-        conn.commit()
 
 # --- Balance ---
 
 def get_current_balance():
     """Get the current balance."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT current_balance FROM balance WHERE id = 1')
-        result = cursor.fetchone()
+    with reader_connection() as conn:
+        result = conn.execute('SELECT current_balance FROM balance WHERE id = 1').fetchone()
         return result[0] if result else 0.0
 
 def set_initial_balance(amount):
-    """Set the initial balance."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        timestamp = datetime.now().isoformat()
+    """Set the initial balance.
 
-        cursor.execute('''
-            INSERT INTO transactions (timestamp, amount, transaction_type, description)
-            VALUES (?, ?, ?, ?)
-        ''', (timestamp, amount, 'initial_balance', f'Initial balance set to {amount:.2f} MDL'))
-
-        cursor.execute('UPDATE balance SET current_balance = ? WHERE id = 1', (amount,))
-        conn.commit()
+    Recorded as an 'initial_balance' transaction carrying the difference from
+    the current balance, so the transaction history stays consistent with it.
+    """
+    with writer_connection() as conn:
+        row = conn.execute('SELECT current_balance FROM balance WHERE id = 1').fetchone()
+        current = row[0] if row else 0.0
+        _record_transaction(
+            conn, amount - current, 'initial_balance', f'Initial balance set to {amount:.2f} MDL'
+        )
+    notify_data_changed()
 
 def record_payment(amount, description):
     """Record a payment (reduces balance)."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        timestamp = datetime.now().isoformat()
-
-        cursor.execute('''
-            INSERT INTO transactions (timestamp, amount, transaction_type, description)
-            VALUES (?, ?, ?, ?)
-        ''', (timestamp, -amount, 'payment', description))
-
-        cursor.execute('UPDATE balance SET current_balance = current_balance - ? WHERE id = 1', (amount,))
-        conn.commit()
+    with writer_connection() as conn:
+        _record_transaction(conn, -amount, 'payment', description)
+    notify_data_changed()
 
 def record_credit_given(amount, description):
     """Record credit given (reduces balance)."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        timestamp = datetime.now().isoformat()
-
-        cursor.execute('''
-            INSERT INTO transactions (timestamp, amount, transaction_type, description)
-            VALUES (?, ?, ?, ?)
-        ''', (timestamp, -amount, 'credit_given', description))
-
-        cursor.execute('UPDATE balance SET current_balance = current_balance - ? WHERE id = 1', (amount,))
-        conn.commit()
+    with writer_connection() as conn:
+        _record_transaction(conn, -amount, 'credit_given', description)
+    notify_data_changed()
 
 # --- Reports ---
 
-def get_weekly_report_data():
-    """Get data for weekly reports."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+def get_scheduled_report_data():
+    """Get everything the weekly report needs for the current ISO week (Monday on).
 
-        cursor.execute('''
-            SELECT COUNT(*), SUM(amount)
-            FROM transactions
-            WHERE transaction_type = 'walk'
-            AND date(timestamp) >= date('now', '-7 days')
-        ''')
-        walk_data = cursor.fetchone()
-        walk_count = walk_data[0] if walk_data[0] else 0
-        walk_total = walk_data[1] if walk_data[1] else 0.0
-
-        cursor.execute('''
-            SELECT SUM(ABS(amount))
+    Returns:
+        (walk_count, walk_total, payment_total, current_balance) tuple
+    """
+    with reader_connection() as conn:
+        walk_count, walk_total, payment_total, current_balance = conn.execute('''
+            SELECT
+                COUNT(CASE WHEN transaction_type = 'walk' THEN 1 END),
+                COALESCE(SUM(CASE WHEN transaction_type = 'walk' THEN amount END), 0),
+                COALESCE(SUM(CASE WHEN transaction_type IN ('payment', 'credit_given')
+                                  THEN ABS(amount) END), 0),
+                (SELECT current_balance FROM balance WHERE id = 1)
             FROM transactions
-            WHERE transaction_type IN ('payment', 'credit_given')
-            AND date(timestamp) >= date('now', '-7 days')
-        ''')
-        payment_result = cursor.fetchone()
-        payment_total = payment_result[0] if payment_result[0] else 0.0
+            WHERE transaction_type IN ('walk', 'payment', 'credit_given')
+            AND timestamp >= ?
+        ''', (_week_start(),)).fetchone()
+        return walk_count, walk_total, payment_total, current_balance or 0.0
 
-        return walk_count, walk_total, payment_total
+def iter_all_transactions_for_report():
+    """Yield all transactions for detailed report (includes notes), newest first.
 
-def get_all_transactions_for_report():
-    """Get all transactions for detailed report (includes notes)."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT timestamp, amount, transaction_type, description, COALESCE(notes, '')
+    Rows are streamed from the cursor instead of being materialized in a list.
+    The export can take a while, so it reads through its own short-lived
+    read-only connection rather than holding the shared reader's lock.
+    """
+    conn = get_db_connection(read_only=True)
+    try:
+        yield from conn.execute(f'''
+            SELECT {LOCAL_TIMESTAMP_SQL}, amount, transaction_type, description, COALESCE(notes, '')
             FROM transactions
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, id DESC
         ''')
-        return cursor.fetchall()
+    finally:
+        conn.close()
 
 def get_transactions_with_ids(limit=None, offset=0):
     """Get transactions with their IDs.
@@ -287,22 +431,33 @@ def get_transactions_with_ids(limit=None, offset=0):
     Returns:
         List of tuples: (id, timestamp, amount, transaction_type, description, notes)
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+    with reader_connection() as conn:
         if limit:
-            cursor.execute('''
-                SELECT id, timestamp, amount, transaction_type, description, COALESCE(notes, '')
+            return conn.execute(f'''
+                SELECT id, {LOCAL_TIMESTAMP_SQL}, amount, transaction_type, description, COALESCE(notes, '')
                 FROM transactions
-                ORDER BY timestamp DESC
+                ORDER BY timestamp DESC, id DESC
                 LIMIT ? OFFSET ?
-            ''', (limit, offset))
+            ''', (limit, offset)).fetchall()
         else:
-            cursor.execute('''
-                SELECT id, timestamp, amount, transaction_type, description, COALESCE(notes, '')
+            return conn.execute(f'''
+                SELECT id, {LOCAL_TIMESTAMP_SQL}, amount, transaction_type, description, COALESCE(notes, '')
                 FROM transactions
-                ORDER BY timestamp DESC
-            ''')
-        return cursor.fetchall()
+                ORDER BY timestamp DESC, id DESC
+            ''').fetchall()
+
+def get_transaction_by_id(transaction_id):
+    """Get a single transaction by its ID.
+
+    Returns:
+        Tuple (id, timestamp, amount, transaction_type, description, notes) or None
+    """
+    with reader_connection() as conn:
+        return conn.execute(f'''
+            SELECT id, {LOCAL_TIMESTAMP_SQL}, amount, transaction_type, description, COALESCE(notes, '')
+            FROM transactions
+            WHERE id = ?
+        ''', (transaction_id,)).fetchone()
 
 def delete_transaction_by_id(transaction_id):
     """Delete a single transaction by its ID and adjust balance accordingly.
@@ -318,14 +473,11 @@ def delete_transaction_by_id(transaction_id):
     }
 
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-
-            cursor.execute(
+        with writer_connection() as conn:
+            row = conn.execute(
                 'SELECT amount, transaction_type FROM transactions WHERE id = ?',
                 (transaction_id,)
-            )
-            row = cursor.fetchone()
+            ).fetchone()
 
             if not row:
                 result["error"] = "Transaction not found"
@@ -333,20 +485,17 @@ def delete_transaction_by_id(transaction_id):
 
             amount, transaction_type = row[0], row[1]
 
-            if transaction_type == 'walk':
-                cursor.execute('UPDATE balance SET current_balance = current_balance - ? WHERE id = 1', (amount,))
-            elif transaction_type in ('payment', 'credit_given'):
-                cursor.execute('UPDATE balance SET current_balance = current_balance + ? WHERE id = 1', (abs(amount),))
-            elif transaction_type == 'initial_balance':
-                cursor.execute('UPDATE balance SET current_balance = current_balance - ? WHERE id = 1', (amount,))
+            # Amounts are signed balance deltas, so reverting is a plain subtraction
+            conn.execute(_SQL_BALANCE_DELTA, (-amount,))
 
-            cursor.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
-            conn.commit()
+            conn.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
 
-            result["success"] = True
-            result["amount"] = amount
-            result["transaction_type"] = transaction_type
-            return result
+        notify_data_changed()
+
+        result["success"] = True
+        result["amount"] = amount
+        result["transaction_type"] = transaction_type
+        return result
 
     except Exception as e:
         result["error"] = str(e)
@@ -354,146 +503,170 @@ def delete_transaction_by_id(transaction_id):
 
 def get_transaction_count():
     """Get total count of transactions."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM transactions')
-        return cursor.fetchone()[0]
+    with reader_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
 
 # --- Streak & Goals ---
 
-def get_streak():
-    """Return the current consecutive-day walk streak."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT date(timestamp, 'localtime') as walk_date
-            FROM transactions WHERE transaction_type = 'walk'
-            ORDER BY walk_date DESC
-        """)
-        dates = [row[0] for row in cursor.fetchall()]
-    if not dates:
-        return 0
-    from datetime import date, timedelta
+def _streak(conn):
+    """Count consecutive walk days ending today or yesterday on an open connection."""
+    from datetime import timedelta
     today = date.today()
-    most_recent = date.fromisoformat(dates[0])
-    if most_recent < today - timedelta(days=1):
-        return 0  # streak broken
     streak = 0
-    expected = most_recent
-    for d in dates:
+    walk_dates = conn.execute("""
+        SELECT DISTINCT date(timestamp, 'unixepoch', 'localtime') as walk_date
+        FROM transactions WHERE transaction_type = 'walk'
+        ORDER BY walk_date DESC
+    """)
+    expected = None
+    for (d,) in walk_dates:
         walk_date = date.fromisoformat(d)
-        if walk_date == expected:
-            streak += 1
-            expected -= timedelta(days=1)
-        else:
+        if expected is None:
+            if walk_date < today - timedelta(days=1):
+                return 0  # streak broken
+            expected = walk_date
+        if walk_date != expected:
             break
+        streak += 1
+        expected -= timedelta(days=1)
     return streak
 
+def get_streak():
+    """Return the current consecutive-day walk streak."""
+    with reader_connection() as conn:
+        return _streak(conn)
+
 def get_walks_this_week():
     """Return the count of walks since last Monday (inclusive)."""
-    from datetime import date, timedelta
-    today = date.today()
-    week_start = (today - timedelta(days=today.weekday())).isoformat()
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+    with reader_connection() as conn:
+        return conn.execute("""
             SELECT COUNT(*) FROM transactions
             WHERE transaction_type = 'walk'
-            AND date(timestamp, 'localtime') >= ?
-        """, (week_start,))
-        return cursor.fetchone()[0]
+            AND timestamp >= ?
+        """, (_week_start(),)).fetchone()[0]
 
 def get_weekly_goal(user_id):
     """Return the weekly walk goal for a user (0 if not set)."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT weekly_goal FROM user_settings WHERE user_id = ?", (user_id,))
-        row = cursor.fetchone()
+    with reader_connection() as conn:
+        row = conn.execute("SELECT weekly_goal FROM user_settings WHERE user_id = ?", (user_id,)).fetchone()
         return row[0] if row else 0
 
 def set_weekly_goal(user_id, goal):
     """Set (UPSERT) the weekly walk goal for a user."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+    with writer_connection() as conn:
+        conn.execute("""
             INSERT INTO user_settings (user_id, weekly_goal)
             VALUES (?, ?)
             ON CONFLICT(user_id) DO UPDATE SET weekly_goal = excluded.weekly_goal
         """, (user_id, goal))
-        conn.commit()
 
 # --- Reminders ---
 
 def get_user_reminder(user_id):
     """Return {'time': str|None, 'enabled': bool} for a user."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
+    with reader_connection() as conn:
+        row = conn.execute(
             "SELECT reminder_time, reminder_enabled FROM user_settings WHERE user_id = ?",
             (user_id,)
-        )
-        row = cursor.fetchone()
+        ).fetchone()
         if row:
             return {'time': row[0], 'enabled': bool(row[1])}
         return {'time': None, 'enabled': False}
 
 def set_user_reminder(user_id, time_str, enabled):
     """UPSERT reminder settings for a user."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+    with writer_connection() as conn:
+        conn.execute("""
             INSERT INTO user_settings (user_id, reminder_time, reminder_enabled)
             VALUES (?, ?, ?)
             ON CONFLICT(user_id) DO UPDATE SET
                 reminder_time = excluded.reminder_time,
                 reminder_enabled = excluded.reminder_enabled
         """, (user_id, time_str, 1 if enabled else 0))
-        conn.commit()
 
 def get_users_with_reminders():
     """Return list of dicts for users with reminders enabled."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+    with reader_connection() as conn:
+        rows = conn.execute("""
             SELECT u.user_id, us.reminder_time
             FROM users u
             JOIN user_settings us ON u.user_id = us.user_id
             WHERE us.reminder_enabled = 1 AND us.reminder_time IS NOT NULL
         """)
-        return [{'user_id': row[0], 'reminder_time': row[1]} for row in cursor.fetchall()]
+        return [{'user_id': row[0], 'reminder_time': row[1]} for row in rows]
 
 # --- Forecast ---
 
-def get_earnings_forecast():
-    """Return projected month earnings based on pace so far."""
-    from datetime import date
-    today = date.today()
+def _forecast(earned, today):
+    """Project a month's earnings from the amount earned so far this month."""
     days_in_month = calendar.monthrange(today.year, today.month)[1]
     day_of_month = today.day
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT COALESCE(SUM(amount), 0) FROM transactions
-            WHERE transaction_type = 'walk'
-            AND strftime('%Y-%m', timestamp) = strftime('%Y-%m', 'now', 'localtime')
-        """)
-        earned = cursor.fetchone()[0]
     if day_of_month == 0:
         return earned
     return round((earned / day_of_month) * days_in_month, 2)
 
+def get_earnings_forecast():
+    """Return projected month earnings based on pace so far."""
+    today = date.today()
+    month_start = _local_day_start(today.replace(day=1))
+    with reader_connection() as conn:
+        earned = conn.execute("""
+            SELECT COALESCE(SUM(amount), 0) FROM transactions
+            WHERE transaction_type = 'walk'
+            AND timestamp >= ?
+        """, (month_start,)).fetchone()[0]
+    return _forecast(earned, today)
+
+# --- Balance overview ---
+
+def get_balance_snapshot(user_id):
+    """Get everything the balance overview shows from one read transaction.
+
+    Holding the reader once and wrapping the queries in BEGIN/COMMIT gives a
+    consistent WAL snapshot, instead of five separate lock round-trips.
+
+    Returns:
+        dict with current_balance, streak, walks_week, goal and forecast
+    """
+    today = date.today()
+    week_start = _week_start()
+    month_start = _local_day_start(today.replace(day=1))
+    with reader_connection() as conn:
+        conn.execute('BEGIN')
+        try:
+            current_balance, goal, walks_week, month_earned = conn.execute("""
+                SELECT
+                    (SELECT current_balance FROM balance WHERE id = 1),
+                    (SELECT weekly_goal FROM user_settings WHERE user_id = ?),
+                    COALESCE(SUM(timestamp >= ?), 0),
+                    COALESCE(SUM(CASE WHEN timestamp >= ? THEN amount END), 0)
+                FROM transactions
+                WHERE transaction_type = 'walk'
+                AND timestamp >= ?
+            """, (user_id, week_start, month_start, min(week_start, month_start))).fetchone()
+            streak = _streak(conn)
+        finally:
+            conn.execute('COMMIT')
+
+    return {
+        'current_balance': current_balance or 0.0,
+        'streak': streak,
+        'walks_week': walks_week,
+        'goal': goal or 0,
+        'forecast': _forecast(month_earned, today),
+    }
+
 # --- Today's walks ---
 
 def get_walks_today():
     """Return the count of walks logged today (localtime)."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
+    with reader_connection() as conn:
+        # Compare against an integer bound so idx_type_ts_amount can seek
+        return conn.execute("""
             SELECT COUNT(*) FROM transactions
             WHERE transaction_type = 'walk'
-            AND date(timestamp, 'localtime') = date('now', 'localtime')
-        """)
-        return cursor.fetchone()[0]
+            AND timestamp >= ?
+        """, (_local_day_start(date.today()),)).fetchone()[0]
 
 # --- Cleanup ---
 
@@ -515,9 +688,7 @@ def auto_cleanup_old_records(months_to_keep=1):
     }
 
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-
+        with writer_connection() as conn:
             from datetime import datetime as _dt
             today = _dt.now()
 
@@ -531,52 +702,106 @@ def auto_cleanup_old_records(months_to_keep=1):
             cutoff_str = cutoff_date.strftime('%Y-%m-%d')
             result["cutoff_date"] = cutoff_str
 
-            cursor.execute(
-                'SELECT COUNT(*) FROM transactions WHERE date(timestamp) < ?',
-                (cutoff_str,)
-            )
-            count_before = cursor.fetchone()[0]
+            cutoff_ts = _local_day_start(cutoff_date.date())
+            count_before = conn.execute(
+                'SELECT COUNT(*) FROM transactions WHERE timestamp < ?',
+                (cutoff_ts,)
+            ).fetchone()[0]
 
-            cursor.execute(
-                'DELETE FROM transactions WHERE date(timestamp) < ?',
-                (cutoff_str,)
+            conn.execute(
+                'DELETE FROM transactions WHERE timestamp < ?',
+                (cutoff_ts,)
             )
 
-            conn.commit()
+        notify_data_changed()
 
-            result["success"] = True
-            result["deleted_count"] = count_before
-            return result
+        result["success"] = True
+        result["deleted_count"] = count_before
+        return result
 
     except Exception as e:
         result["error"] = str(e)
         return result
 
-def get_stats_summary():
-    """Get optimized statistics summary without loading all transactions."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
+def get_dashboard_stats():
+    """Get balance and walk totals for the dashboard in a single query.
 
-        cursor.execute('''
-            SELECT COUNT(*), COALESCE(SUM(amount), 0)
+    Returns:
+        dict with current_balance, total_walks, total_earned and walks_today
+    """
+    with reader_connection() as conn:
+        current_balance, total_walks, total_earned, walks_today = conn.execute('''
+            SELECT
+                (SELECT current_balance FROM balance WHERE id = 1),
+                COUNT(*),
+                COALESCE(SUM(amount), 0),
+                COALESCE(SUM(timestamp >= ?), 0)
             FROM transactions
             WHERE transaction_type = 'walk'
-        ''')
-        walk_data = cursor.fetchone()
-        total_walks = walk_data[0] if walk_data[0] else 0
-        total_earned = walk_data[1] if walk_data[1] else 0.0
+        ''', (_local_day_start(date.today()),)).fetchone()
 
-        cursor.execute('''
-            SELECT COUNT(*)
-            FROM transactions
-            WHERE transaction_type = 'walk'
-            AND date(timestamp) = date('now', 'localtime')
-        ''')
-        walks_today_result = cursor.fetchone()
-        walks_today = walks_today_result[0] if walks_today_result else 0
-
-        return {
-            'total_walks': total_walks,
-            'total_earned': total_earned,
-            'walks_today': walks_today
-        }
+    return {
+        'current_balance': current_balance or 0.0,
+        'total_walks': total_walks,
+        'total_earned': total_earned,
+        'walks_today': walks_today
+    }
+
+def get_dashboard_stats_cached(ttl=DASHBOARD_STATS_TTL):
+    """Return get_dashboard_stats(), memoized for up to ttl seconds.
+
+    Every write invalidates the memo, so a longer TTL only delays the
+    walks_today rollover at midnight; redraws in between cost no SQL.
+    """
+    global _dashboard_stats_cache, _dashboard_stats_time
+    now = time.monotonic()
+    cached = _dashboard_stats_cache
+    if cached is not None and now - _dashboard_stats_time <= ttl:
+        return dict(cached)
+
+    generation = _data_generation
+    stats = get_dashboard_stats()
+    # A write that committed mid-query may not be in stats; return it but
+    # don't let it stand in as fresh for the next ttl seconds
+    if generation == _data_generation:
+        _dashboard_stats_cache = stats
+        _dashboard_stats_time = now
+    return dict(stats)
+
+# --- Async wrappers ---
+# Telegram handlers run on the asyncio event loop. These coroutines run the
+# blocking SQLite work, including the writer's commit, on a worker thread so
+# the loop keeps serving other updates meanwhile.
+
+def _in_thread(func):
+    """Wrap a blocking database function as a coroutine using asyncio.to_thread."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    wrapper.__name__ = wrapper.__qualname__ = f'{func.__name__}_async'
+    return wrapper
+
+add_walk_async = _in_thread(add_walk)
+get_current_balance_async = _in_thread(get_current_balance)
+set_initial_balance_async = _in_thread(set_initial_balance)
+record_payment_async = _in_thread(record_payment)
+record_credit_given_async = _in_thread(record_credit_given)
+get_scheduled_report_data_async = _in_thread(get_scheduled_report_data)
+get_transactions_with_ids_async = _in_thread(get_transactions_with_ids)
+get_transaction_by_id_async = _in_thread(get_transaction_by_id)
+delete_transaction_by_id_async = _in_thread(delete_transaction_by_id)
+get_transaction_count_async = _in_thread(get_transaction_count)
+get_walk_rate_async = _in_thread(get_walk_rate)
+set_walk_rate_async = _in_thread(set_walk_rate)
+register_user_async = _in_thread(register_user)
+get_all_user_ids_async = _in_thread(get_all_user_ids)
+get_walks_this_week_async = _in_thread(get_walks_this_week)
+get_weekly_goal_async = _in_thread(get_weekly_goal)
+set_weekly_goal_async = _in_thread(set_weekly_goal)
+get_user_reminder_async = _in_thread(get_user_reminder)
+set_user_reminder_async = _in_thread(set_user_reminder)
+get_users_with_reminders_async = _in_thread(get_users_with_reminders)
+get_balance_snapshot_async = _in_thread(get_balance_snapshot)
+get_walks_today_async = _in_thread(get_walks_today)
+update_walk_note_async = _in_thread(update_walk_note)
+auto_cleanup_old_records_async = _in_thread(auto_cleanup_old_records)
@@ -1,6 +1,13 @@
 # main.py
+import asyncio
 import datetime
 import logging
+import time
+
+try:
+    import uvloop  # Optional: faster event loop for the Telegram handlers
+except ImportError:
+    uvloop = None
 
 from telegram.ext import ApplicationBuilder, CallbackContext
 from telegram.constants import ParseMode
@@ -11,8 +18,9 @@ from config import (
     AUTO_CLEANUP_DAY, AUTO_CLEANUP_MONTHS_TO_KEEP, AUTO_CLEANUP_ENABLED
 )
 from database import (
-    init_db, get_current_balance, get_stats_summary,
-    auto_cleanup_old_records, get_users_with_reminders, get_walks_today
+    ensure_data_directory, init_db, get_dashboard_stats_cached,
+    auto_cleanup_old_records_async, get_users_with_reminders_async, get_walks_today_async,
+    subscribe
 )
 from bot_logic import setup_handlers, send_scheduled_report
 from oled_display import OLEDDisplayManager
@@ -25,29 +33,24 @@ logger = logging.getLogger(__name__)
 
 class BotStatsManager:
     def __init__(self):
-        self.start_time = datetime.datetime.now()
+        # Monotonic clock: uptime is a plain float subtraction, immune to clock changes
+        self.start_time = time.monotonic()
         self.bot_running = False
         self.last_activity = datetime.datetime.now()
         self.message_count = 0
-        self._stats_cache = {}
-        self._last_cache_update = None
         self._cache_duration = STATS_CACHE_DURATION
 
     def get_stats(self):
-        uptime = (datetime.datetime.now() - self.start_time).total_seconds()
-        now = datetime.datetime.now()
-        if (self._last_cache_update is None or
-                (now - self._last_cache_update).total_seconds() > self._cache_duration):
-            self._stats_cache = get_stats_summary()
-            self._stats_cache['current_balance'] = get_current_balance()
-            self._last_cache_update = now
+        uptime = time.monotonic() - self.start_time
+        # Cached in database.py and invalidated on every write
+        stats = get_dashboard_stats_cached(self._cache_duration)
         return {
             'bot_running': self.bot_running,
             'uptime': uptime,
-            'current_balance': self._stats_cache.get('current_balance', 0.0),
-            'total_walks': self._stats_cache.get('total_walks', 0),
-            'walks_today': self._stats_cache.get('walks_today', 0),
-            'total_earned': self._stats_cache.get('total_earned', 0.0),
+            'current_balance': stats['current_balance'],
+            'total_walks': stats['total_walks'],
+            'walks_today': stats['walks_today'],
+            'total_earned': stats['total_earned'],
             'message_count': self.message_count,
             'last_activity': self.last_activity,
         }
@@ -55,7 +58,6 @@ class BotStatsManager:
     def record_activity(self):
         self.last_activity = datetime.datetime.now()
         self.message_count += 1
-        self._last_cache_update = None
 
 
 # Global stats manager
@@ -72,7 +74,7 @@ async def weekly_report_job(context: CallbackContext):
 async def auto_cleanup_job(context: CallbackContext):
     """Monthly automatic database cleanup."""
     logger.info("Running automatic monthly cleanup...")
-    result = auto_cleanup_old_records(AUTO_CLEANUP_MONTHS_TO_KEEP)
+    result = await auto_cleanup_old_records_async(AUTO_CLEANUP_MONTHS_TO_KEEP)
     if result["success"]:
         logger.info(f"Auto-cleanup: deleted {result['deleted_count']} records older than {result['cutoff_date']}")
         if YOUR_TELEGRAM_CHAT_ID:
@@ -99,9 +101,9 @@ async def auto_cleanup_job(context: CallbackContext):
 async def daily_reminders_job(context: CallbackContext):
     """Send daily reminders to users who haven't logged a walk yet."""
     current_time = datetime.datetime.now().strftime('%H:%M')
-    if get_walks_today() > 0:
+    if await get_walks_today_async() > 0:
         return  # walks already logged today, no reminder needed
-    for user in get_users_with_reminders():
+    for user in await get_users_with_reminders_async():
         if user['reminder_time'] == current_time:
             try:
                 await context.bot.send_message(
@@ -115,11 +117,19 @@ async def daily_reminders_job(context: CallbackContext):
 
 def main():
     logger.info("Initializing K9LogBot...")
+    ensure_data_directory()
     init_db()
     logger.info("Database initialized.")
 
     oled_display = OLEDDisplayManager(stats_manager.get_stats)
     oled_display.start()
+    # Push-based refresh: redraw as soon as a write commits instead of waiting
+    # for the next display interval
+    subscribe(oled_display.request_refresh)
+
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop.")
 
     application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
 
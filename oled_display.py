@@ -1,17 +1,64 @@
 # oled_display.py
+import queue
+import textwrap
 import threading
 import time
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import datetime
 from zoneinfo import ZoneInfo
 from luma.core.interface.serial import i2c
-from luma.core.render import canvas
 from luma.oled.device import ssd1306
+from PIL import Image, ImageChops, ImageDraw, ImageFont
 import logging
 from config import DISPLAY_UPDATE_INTERVAL
 
 logger = logging.getLogger(__name__)
 
+_CHISINAU_TZ = ZoneInfo("Europe/Chisinau")
+
+# Static screen layout, shared by every frame
+_SCREEN_INDICATORS = ("Screen 1/3", "Screen 2/3", "Screen 3/3")
+# Title underline: two 1px rules where a row of "=" used to be, as wide as
+# 16 or 12 of those characters
+_SEP16 = 96
+_SEP12 = 72
+_SEP_ROWS = (16, 18)
+
+# SSD1306 addressing commands used for partial (windowed) updates
+_SSD1306_COLUMNADDR = 0x21
+_SSD1306_PAGEADDR = 0x22
+# Rough cost in bytes of opening another window: two I2C transactions for the
+# address commands and the data prefix
+_WINDOW_OVERHEAD = 10
+
+# The I2C clock is set by the kernel (dtparam=i2c_arm_baudrate in
+# /boot/config.txt), not by luma; this is where the Pi exposes it.
+_I2C_CLOCK_PATH = "/sys/class/i2c-adapter/i2c-{port}/of_node/clock-frequency"
+
+
+def _i2c_bus_clock_hz(port):
+    """Return the configured I2C bus clock in Hz, or None if it can't be read."""
+    try:
+        with open(_I2C_CLOCK_PATH.format(port=port), "rb") as f:
+            return int.from_bytes(f.read(4), "big")
+    except (OSError, ValueError):
+        return None
+
 class OLEDDisplayManager:
+    # Fixed attribute set: no per-instance __dict__, and the display loop's
+    # attribute reads are slot lookups
+    __slots__ = (
+        'get_stats_callback', 'device', 'running', 'display_thread',
+        'current_screen', 'last_update', 'update_interval',
+        'notification_active', 'notification_end_time', 'notification_message',
+        '_notification_lines', '_pending_notifications', '_cv', '_wakeup',
+        '_screen_cache', '_last_pushed_key', '_tx_queue', '_tx_thread',
+        '_tx_lock', '_tx_closed',
+        '_last_image', '_backgrounds', '_font', '_line_height', '_time_cache_sec',
+        '_time_cache_key', '_uptime_min', '_uptime_str', '_stats_cache_value',
+        '_stats_cache_ts', '_stats_cache_generation', '_stats_generation',
+    )
+
     def __init__(self, get_stats_callback):
         """
         Initialize OLED display manager.
@@ -25,16 +72,72 @@ class OLEDDisplayManager:
         self.last_update = datetime.now()
         # Performance optimization: configurable update interval
         self.update_interval = DISPLAY_UPDATE_INTERVAL
-        # Notification management
+        # Notification management; notification_end_time is on the
+        # time.monotonic() clock, like every other deadline in the loop
         self.notification_active = False
         self.notification_end_time = None
         self.notification_message = ""
+        self._notification_lines = ()
+        # Notifications that arrived while another was showing, as
+        # (lines, message, duration); shown in order as each one expires
+        self._pending_notifications = deque(maxlen=5)
+        # The display thread sleeps on this until its next deadline or until
+        # show_notification(), request_refresh() or stop() sets _wakeup
+        self._cv = threading.Condition()
+        self._wakeup = False
+        # Rendered frames: screen id -> (content key, image). A screen is only
+        # redrawn when its content key changes, and only pushed over I2C when
+        # it differs from what the panel already shows.
+        self._screen_cache = {}
+        # (screen id, key) of the last frame written successfully (set by
+        # the I2C thread only)
+        self._last_pushed_key = None
+        # (screen id, key, image) frames waiting for the I2C thread. It holds
+        # one slot: a frame that is not yet sent when a newer one arrives is
+        # dropped. _tx_lock serialises the producers (_submit and the stop
+        # sentinel); once _tx_closed is set no more frames are accepted.
+        self._tx_queue = queue.Queue(maxsize=1)
+        self._tx_thread = None
+        self._tx_lock = threading.Lock()
+        self._tx_closed = False
+        # Image currently on the panel, diffed against the next frame (I2C
+        # thread only)
+        self._last_image = None
+        # Static title/separator/indicator layer per screen, built in start()
+        self._backgrounds = {}
+        # Loaded once; a fresh ImageDraw would otherwise load it on every frame
+        self._font = ImageFont.load_default()
+        # multiline_text() advances lines by this plus its spacing argument
+        self._line_height = self._font.getbbox("A")[3]
+        # Formatted (date, time, day) strings, recomputed once per epoch second
+        self._time_cache_sec = None
+        self._time_cache_key = None
+        # "Uptime: HH:MM" text and the uptime minute it was formatted for
+        self._uptime_min = None
+        self._uptime_str = ""
+        # Last get_stats_callback() result, reused for update_interval seconds
+        self._stats_cache_value = None
+        self._stats_cache_ts = None
+        # request_refresh() bumps _stats_generation; the cached value is only
+        # reused while it was read at the current generation
+        self._stats_generation = 0
+        self._stats_cache_generation = -1
         
         # Try to initialize display
         try:
+            # Let luma open the bus itself: a managed smbus2 bus sends each
+            # data() payload as a single I2C_RDWR message instead of 32-byte
+            # SMBus block writes, so a full frame is one bus transaction.
             serial = i2c(port=1, address=0x3C)  # Common I2C address for OLED
             self.device = ssd1306(serial, width=128, height=64)
             logger.info("OLED display initialized successfully")
+            clock_hz = _i2c_bus_clock_hz(1)
+            if clock_hz is None:
+                logger.info("I2C bus clock unknown")
+            else:
+                logger.info(f"I2C bus clock: {clock_hz // 1000} kHz")
+                if clock_hz < 400000:
+                    logger.warning("I2C bus below 400 kHz; set dtparam=i2c_arm_baudrate=400000 in /boot/config.txt for faster OLED updates")
         except Exception as e:
             logger.error(f"Failed to initialize OLED display: {e}")
             self.device = None
@@ -45,7 +148,16 @@ class OLEDDisplayManager:
             logger.warning("OLED display not available, skipping display updates")
             return
         
+        self._backgrounds = {
+            0: self._build_background("K9 LOG BOT", _SEP16, _SCREEN_INDICATORS[0]),
+            1: self._build_background("CHISINAU TIME", _SEP16, _SCREEN_INDICATORS[1]),
+            2: self._build_background("BOT INFO", _SEP12, _SCREEN_INDICATORS[2]),
+            3: self._build_background("NOTIFICATION", _SEP16),
+        }
+
         self.running = True
+        self._tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+        self._tx_thread.start()
         self.display_thread = threading.Thread(target=self._display_loop, daemon=True)
         self.display_thread.start()
         logger.info("OLED display thread started")
@@ -53,25 +165,74 @@ class OLEDDisplayManager:
     def stop(self):
         """Stop the display update thread."""
         self.running = False
+        self._wake()
         if self.display_thread:
             self.display_thread.join(timeout=self.update_interval + 1)
+        if self._tx_thread:
+            # Close the queue so a display thread that outlived its join can't
+            # evict the sentinel, then let the last queued frame go out
+            with self._tx_lock:
+                self._tx_closed = True
+                try:
+                    self._tx_queue.put(None, timeout=2)
+                except queue.Full:
+                    pass
+            self._tx_thread.join(timeout=2)
+            if self._tx_thread.is_alive():
+                # Still inside an I2C write; releasing the device under it is unsafe
+                logger.warning("OLED I2C thread did not stop; skipping device cleanup")
+                return
         if self.device:
             self.device.cleanup()
         logger.info("OLED display stopped")
     
+    def _wake(self):
+        """Wake the display thread so it re-evaluates its state immediately."""
+        with self._cv:
+            self._wakeup = True
+            self._cv.notify()
+
     def _display_loop(self):
-        """Main display loop that cycles through different screens."""
+        """Main display loop that cycles through different screens.
+
+        Between frames the thread blocks on a condition variable until the next
+        screen change or notification expiry, so an idle display costs one
+        wakeup per interval and a new notification appears at once.
+
+        Notification state is shared with show_notification() callers, so it
+        is copied under the condition's lock; rendering and the I2C push run
+        on that snapshot with the lock released.
+        """
+        next_screen_change = time.monotonic() + self.update_interval
         while self.running:
             try:
+                with self._cv:
+                    if self.notification_active and time.monotonic() >= self.notification_end_time:
+                        # Notification expired
+                        if self._pending_notifications:
+                            self._set_notification(*self._pending_notifications.popleft())
+                        else:
+                            self.notification_active = False
+                            self.notification_message = ""
+                            self._notification_lines = ()
+                            self.notification_end_time = None
+                    notification_active = self.notification_active
+                    notification_lines = self._notification_lines
+                    notification_end_time = self.notification_end_time
+
                 # Check if notification should be shown
-                if self.notification_active and datetime.now() < self.notification_end_time:
-                    self._draw_notification_screen()
-                elif self.notification_active:
-                    # Notification expired
-                    self.notification_active = False
-                    self.notification_message = ""
-                    self.notification_end_time = None
+                if notification_active:
+                    self._draw_notification_screen(notification_lines)
+                    deadline = notification_end_time
                 else:
+                    # Only cycle screens when not showing notification. A data
+                    # change wakes the loop early and redraws the same screen
+                    # with fresh stats instead of advancing.
+                    now = time.monotonic()
+                    if now >= next_screen_change:
+                        self.current_screen = (self.current_screen + 1) % len(_SCREEN_INDICATORS)
+                        next_screen_change = now + self.update_interval
+
                     # Show normal screens
                     if self.current_screen == 0:
                         self._draw_status_screen()
@@ -79,110 +240,259 @@ class OLEDDisplayManager:
                         self._draw_chisinau_time_screen()
                     elif self.current_screen == 2:
                         self._draw_simple_info_screen()  # Simplified instead of complex pixel city
-                    
-                    # Only cycle screens when not showing notification
-                    # Performance optimization: longer sleep interval
-                    time.sleep(self.update_interval)
-                    self.current_screen = (self.current_screen + 1) % 3
-                
+                    deadline = next_screen_change
+
+                self._sleep_until(deadline)
+
             except Exception as e:
                 logger.error(f"Error in display loop: {e}")
-                time.sleep(1)
-    
+                # Back off, but still return at once when stop() is called
+                self._sleep_until(time.monotonic() + 1)
+
+    def _sleep_until(self, deadline):
+        """Block until the monotonic deadline, or until _wake() is called."""
+        with self._cv:
+            if self.running and not self._wakeup:
+                self._cv.wait(timeout=max(0.0, deadline - time.monotonic()))
+            self._wakeup = False
+
+    def _build_background(self, title, separator, indicator=None):
+        """Render a screen's immutable title, separator and indicator once.
+
+        separator is the underline width in pixels.
+        """
+        image = Image.new(self.device.mode, self.device.size)
+        draw = ImageDraw.Draw(image)
+        draw.text((0, 0), title, fill="white", font=self._font)
+        for y in _SEP_ROWS:
+            draw.line([(0, y), (separator - 1, y)], fill="white")
+        if indicator:
+            draw.text((90, 54), indicator, fill="white", font=self._font)
+        return image
+
+    def _draw_lines(self, draw, y, lines, pitch=12):
+        """Draw lines at x=0 from y down, pitch pixels apart, in one multiline_text call."""
+        draw.multiline_text((0, y), "\n".join(lines), fill="white", font=self._font,
+                            spacing=pitch - self._line_height)
+
+    def _present(self, screen_id, key, paint):
+        """Show a screen whose content is fully described by the tuple `key`.
+
+        paint(draw, key) draws the dynamic parts on a copy of the screen's
+        background; it only runs when key differs from the cached frame.
+        """
+        cached = self._screen_cache.get(screen_id)
+        if cached is not None and cached[0] == key:
+            image = cached[1]
+        else:
+            image = self._backgrounds[screen_id].copy()
+            paint(ImageDraw.Draw(image), key)
+            self._screen_cache[screen_id] = (key, image)
+
+        # _last_pushed_key only moves once the frame is on the panel, so a
+        # frame that is still queued, or whose write failed, is submitted
+        # again on the next draw (an unchanged resubmit costs no I2C)
+        if (screen_id, key) != self._last_pushed_key:
+            self._submit((screen_id, key, image))
+
+    def _submit(self, frame):
+        """Hand a frame to the I2C thread without waiting for the transfer.
+
+        Producers hold _tx_lock, so after discarding a frame that is still
+        pending the put cannot fail, and nothing is queued after stop()'s
+        sentinel.
+        """
+        with self._tx_lock:
+            if self._tx_closed:
+                return
+            try:
+                self._tx_queue.put_nowait(frame)
+            except queue.Full:
+                try:
+                    self._tx_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._tx_queue.put_nowait(frame)
+
+    def _tx_loop(self):
+        """Send queued frames to the panel until stop() queues None."""
+        while True:
+            frame = self._tx_queue.get()
+            if frame is None:
+                break
+            screen_id, key, image = frame
+            try:
+                self._push(image)
+            except Exception as e:
+                logger.error(f"Error sending OLED frame: {e}")
+                # Panel contents are unknown now; resend the next frame in full
+                self._last_image = None
+                self._last_pushed_key = None
+            else:
+                self._last_pushed_key = (screen_id, key)
+
+    def _push(self, image):
+        """Send only the pages and columns that differ from the panel's contents.
+
+        The SSD1306 stores the screen as 8 pages of 8-pixel-tall columns, so the
+        changed bounding box is widened to whole pages and written through a
+        column/page address window; a clock tick touches one or two pages
+        instead of the full 1024-byte framebuffer. The first frame is sent as a
+        window covering the whole panel, which also bypasses luma's per-pixel
+        Python packing in device.display().
+
+        When changes sit in different columns on different pages (say a date
+        on the left and a digit on the right), one window per dirty page is
+        sent instead, if that is smaller once the extra per-window cost is
+        counted.
+        """
+        if self._last_image is None:
+            self._send_window(image, 0, image.width, 0, image.height // 8 - 1)
+            self._last_image = image
+            return
+
+        diff = ImageChops.logical_xor(self._last_image, image)
+        bbox = diff.getbbox()
+        if bbox is None:
+            return
+
+        x0, y0, x1, y1 = bbox
+        p0, p1 = y0 // 8, (y1 - 1) // 8
+        spans = []
+        for page in range(p0, p1 + 1):
+            page_bbox = diff.crop((0, page * 8, diff.width, page * 8 + 8)).getbbox()
+            if page_bbox is not None:
+                spans.append((page, page_bbox[0], page_bbox[2]))
+
+        window_bytes = (x1 - x0) * (p1 - p0 + 1)
+        span_bytes = sum(c1 - c0 for _, c0, c1 in spans) + _WINDOW_OVERHEAD * (len(spans) - 1)
+        if span_bytes < window_bytes:
+            for page, c0, c1 in spans:
+                self._send_window(image, c0, c1, page, page)
+        else:
+            self._send_window(image, x0, x1, p0, p1)
+        self._last_image = image
+
+    def _send_window(self, image, x0, x1, p0, p1):
+        """Write columns x0..x1-1 of pages p0..p1 of image to the panel."""
+        self.device.command(_SSD1306_COLUMNADDR, x0, x1 - 1, _SSD1306_PAGEADDR, p0, p1)
+        self.device.data(list(self._page_bytes(image, x0, x1, p0, p1)))
+
+    @staticmethod
+    def _page_bytes(image, x0, x1, p0, p1):
+        """Pack columns x0..x1-1 of pages p0..p1 in SSD1306 GDDRAM byte order.
+
+        Each byte is one column of a page with the top pixel in bit 0. Turning
+        the region so its columns become rows, bottom pixel first, lets PIL's
+        MSB-first "1" packing produce those bytes directly; they come out one
+        row per column, last page first, and are regrouped page by page.
+        """
+        region = image.crop((x0, p0 * 8, x1, (p1 + 1) * 8))
+        region = region.transpose(Image.Transpose.TRANSPOSE).transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+        raw = region.tobytes()
+        pages = p1 - p0 + 1
+        return b"".join(raw[pages - 1 - p::pages] for p in range(pages))
+
+    def _stats(self):
+        """Return bot statistics, calling get_stats_callback at most once per interval."""
+        now = time.monotonic()
+        if (self._stats_cache_generation != self._stats_generation
+                or now - self._stats_cache_ts > self.update_interval):
+            # Tag the result with the generation seen before the read, so a
+            # refresh that lands mid-read forces another read next time
+            generation = self._stats_generation
+            self._stats_cache_value = self.get_stats_callback()
+            self._stats_cache_ts = now
+            self._stats_cache_generation = generation
+        return self._stats_cache_value
+
     def _draw_status_screen(self):
         """Draw bot status screen."""
-        with canvas(self.device) as draw:
-            # Title
-            draw.text((0, 0), "K9 LOG BOT", fill="white")
-            draw.text((0, 12), "=" * 16, fill="white")
-            
-            # Status
-            stats = self.get_stats_callback()
-            status = "ONLINE" if stats['bot_running'] else "OFFLINE"
-            draw.text((0, 24), f"Status: {status}", fill="white")
-            
-            # Uptime
-            uptime = stats.get('uptime', 0)
-            hours = int(uptime // 3600)
-            minutes = int((uptime % 3600) // 60)
-            draw.text((0, 36), f"Uptime: {hours:02d}:{minutes:02d}", fill="white")
-            
-            # Screen indicator
-            draw.text((90, 54), "Screen 1/3", fill="white")
-    
+        stats = self._stats()
+        minute = int(stats.get('uptime', 0)) // 60
+        if minute != self._uptime_min:
+            self._uptime_min = minute
+            self._uptime_str = f"Uptime: {minute // 60:02d}:{minute % 60:02d}"
+        key = ("Status: ONLINE" if stats['bot_running'] else "Status: OFFLINE", self._uptime_str)
+        self._present(0, key, self._paint_status_screen)
+
+    def _paint_status_screen(self, draw, key):
+        self._draw_lines(draw, 24, key)
+
     def _draw_chisinau_time_screen(self):
         """Draw time and date screen for Chisinau, Moldova."""
-        with canvas(self.device) as draw:
+        sec = int(time.time())
+        if sec != self._time_cache_sec:
             # Get current time in Chisinau timezone
-            chisinau_tz = ZoneInfo("Europe/Chisinau")
-            now = datetime.now(chisinau_tz)
-            
-            # Title
-            draw.text((0, 0), "CHISINAU TIME", fill="white")
-            draw.text((0, 12), "=" * 16, fill="white")
-            
-            # Date
-            date_str = now.strftime("%Y-%m-%d")
-            draw.text((0, 26), date_str, fill="white")
-            
-            # Time
-            time_str = now.strftime("%H:%M:%S")
-            draw.text((0, 38), time_str, fill="white")
-            
-            # Day of week
-            day_str = now.strftime("%A")
-            draw.text((0, 50), day_str, fill="white")
-            
-            draw.text((90, 54), "Screen 2/3", fill="white")
-    
+            now = datetime.now(_CHISINAU_TZ)
+            self._time_cache_key = (now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"), now.strftime("%A"))
+            self._time_cache_sec = sec
+        self._present(1, self._time_cache_key, self._paint_chisinau_time_screen)
+
+    def _paint_chisinau_time_screen(self, draw, key):
+        self._draw_lines(draw, 26, key)
+
     def _draw_simple_info_screen(self):
         """Draw a simple information screen (performance optimized)."""
-        with canvas(self.device) as draw:
-            # Title
-            draw.text((0, 0), "BOT INFO", fill="white")
-            draw.text((0, 12), "=" * 12, fill="white")
-            
-            # Get stats for additional info
-            stats = self.get_stats_callback()
-            
-            # Show total walks and earnings
-            draw.text((0, 24), f"Total walks: {stats.get('total_walks', 0)}", fill="white")
-            draw.text((0, 36), f"Today: {stats.get('walks_today', 0)} walks", fill="white")
-            draw.text((0, 48), f"Balance: {stats.get('current_balance', 0):.1f} MDL", fill="white")
-            
-            draw.text((90, 54), "Screen 3/3", fill="white")
-    
-    def _draw_notification_screen(self):
+        stats = self._stats()
+        key = (
+            stats.get('total_walks', 0),
+            stats.get('walks_today', 0),
+            f"{stats.get('current_balance', 0):.1f}",
+        )
+        self._present(2, key, self._paint_simple_info_screen)
+
+    def _paint_simple_info_screen(self, draw, key):
+        total_walks, walks_today, balance = key
+        self._draw_lines(draw, 24, (
+            f"Total walks: {total_walks}",
+            f"Today: {walks_today} walks",
+            f"Balance: {balance} MDL",
+        ))
+
+    def _draw_notification_screen(self, lines):
         """Draw notification screen."""
-        with canvas(self.device) as draw:
-            draw.text((0, 0), "NOTIFICATION", fill="white")
-            draw.text((0, 12), "=" * 16, fill="white")
-            
-            # Word wrap for long messages
-            words = self.notification_message.split()
-            lines = []
-            current_line = ""
-            
-            for word in words:
-                if len(current_line + word) < 16:
-                    current_line += word + " "
-                else:
-                    lines.append(current_line.strip())
-                    current_line = word + " "
-            
-            if current_line:
-                lines.append(current_line.strip())
-            
-            # Display up to 3 lines
-            for i, line in enumerate(lines[:3]):
-                draw.text((0, 24 + i * 10), line, fill="white")
-    
+        self._present(3, lines, self._paint_notification_screen)
+
+    def _paint_notification_screen(self, draw, lines):
+        self._draw_lines(draw, 24, lines, pitch=10)
+
+    def request_refresh(self):
+        """Redraw the current screen now instead of at the next interval.
+
+        Safe to call from any thread; used as a database change listener, so
+        the cached stats are dropped and re-read on the next draw.
+        """
+        if not self.running:
+            return
+        self._stats_generation += 1
+        self._wake()
+
     def show_notification(self, message, duration=3):
         """Show a temporary notification (optimized to avoid thread creation)."""
         if self.device is None:
             return
         
-        # Set notification state instead of creating new thread
+        # Set notification state instead of creating new thread. The message
+        # is wrapped once here (up to 3 lines of 15 characters) rather than
+        # on every redraw.
+        lines = tuple(textwrap.wrap(message, width=15)[:3])
+        with self._cv:
+            if self._pending_notifications or (
+                    self.notification_active and time.monotonic() < self.notification_end_time - 0.2):
+                # Queue behind the one on screen and any already waiting, so
+                # messages keep their order; a repeat of the newest adds nothing
+                newest = self._pending_notifications[-1][1] if self._pending_notifications else self.notification_message
+                if message != newest:
+                    self._pending_notifications.append((lines, message, duration))
+                return
+            self._set_notification(lines, message, duration)
+            self._wakeup = True
+            self._cv.notify()
+
+    def _set_notification(self, lines, message, duration):
+        """Make a notification current. Caller holds self._cv."""
+        self._notification_lines = lines
         self.notification_message = message
         self.notification_active = True
-        self.notification_end_time = datetime.now() + timedelta(seconds=duration)
\ No newline at end of file
+        self.notification_end_time = time.monotonic() + duration
\ No newline at end of file
@@ -1,10 +1,11 @@
 # report_cleanup.py
 
-import sqlite3
-from datetime import datetime
-import os
+from datetime import datetime, timedelta
 
-from database import DB_PATH
+from database import (
+    LOCAL_TIMESTAMP_SQL, _in_thread, delete_transaction_by_id, notify_data_changed,
+    reader_connection, writer_connection,
+)
 
 def validate_date(date_text):
     """Validates that the date string is in YYYY-MM-DD format."""
@@ -13,6 +14,10 @@ def validate_date(date_text):
     except ValueError:
         raise ValueError(f"Incorrect date format for '{date_text}', should be YYYY-MM-DD")
 
+def _epoch_range(start_dt, end_dt):
+    """Epoch-second bounds [start, end) covering both dates in full, local time."""
+    return int(start_dt.timestamp()), int((end_dt + timedelta(days=1)).timestamp())
+
 def clean_detailed_report(from_date, to_date):
     """
     Removes all detailed report entries between two dates (inclusive).
@@ -37,51 +42,43 @@ def clean_detailed_report(from_date, to_date):
         if start_dt > end_dt:
             raise ValueError("from_date must be before or equal to to_date")
 
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        # Get count before delete
-        c.execute(
-            "SELECT COUNT(*) FROM transactions WHERE DATE(timestamp) >= ? AND DATE(timestamp) <= ?",
-            (from_date, to_date)
-        )
-        count_before = c.fetchone()[0]
-
-        # Delete
-        c.execute(
-            "DELETE FROM transactions WHERE DATE(timestamp) >= ? AND DATE(timestamp) <= ?",
-            (from_date, to_date)
-        )
-        conn.commit()
+        bounds = _epoch_range(start_dt, end_dt)
+
+        with writer_connection() as conn:
+            deleted = conn.execute(
+                "DELETE FROM transactions WHERE timestamp >= ? AND timestamp < ?",
+                bounds
+            ).rowcount
+        notify_data_changed()
 
         result["success"] = True
-        result["deleted_count"] = count_before
-        conn.close()
+        result["deleted_count"] = deleted
         return result
 
     except Exception as e:
         result["error"] = str(e)
         return result
 
+def iter_report_entries(from_date, to_date):
+    """
+    Yield the transactions in the date range as dicts, oldest first.
+    Rows are converted as the cursor advances instead of being fetched into a list first.
+    """
+    bounds = _epoch_range(validate_date(from_date), validate_date(to_date))
+    with reader_connection() as conn:
+        for date, amount, tx_type, description in conn.execute(
+            f"SELECT {LOCAL_TIMESTAMP_SQL}, amount, transaction_type, description FROM transactions WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp ASC, id ASC",
+            bounds
+        ):
+            yield {"date": date, "amount": amount, "type": tx_type, "description": description}
+
 def get_report_entries(from_date, to_date):
     """
     Retrieve all transactions in the date range for reporting purposes.
     Returns a list of dicts: [{date, amount, type, description}, ...]
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute(
-            "SELECT timestamp, amount, transaction_type, description FROM transactions WHERE DATE(timestamp) >= ? AND DATE(timestamp) <= ? ORDER BY timestamp ASC",
-            (from_date, to_date)
-        )
-        rows = c.fetchall()
-        conn.close()
-        return [
-            {
-                "date": row[0], "amount": row[1], "type": row[2], "description": row[3]
-            }
-            for row in rows
-        ]
+        return list(iter_report_entries(from_date, to_date))
     except Exception as e:
         print(f"[get_report_entries] Error: {e}")
         return []
@@ -89,12 +86,8 @@ def get_report_entries(from_date, to_date):
 def get_total_transactions_count():
     """Returns the total number of transactions in the DB."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM transactions")
-        count = c.fetchone()[0]
-        conn.close()
-        return count
+        with reader_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
     except Exception as e:
         print(f"[get_total_transactions_count] Error: {e}")
         return 0
@@ -104,12 +97,8 @@ def get_transaction_table_structure():
     Returns the schema of the transactions table for debugging/documentation.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("PRAGMA table_info(transactions)")
-        info = c.fetchall()
-        conn.close()
-        return info
+        with reader_connection() as conn:
+            return conn.execute("PRAGMA table_info(transactions)").fetchall()
     except Exception as e:
         print(f"[get_transaction_table_structure] Error: {e}")
         return []
@@ -120,14 +109,11 @@ def get_recent_entries(count=10):
     Returns a list of dicts with transaction details including IDs.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute(
-            "SELECT id, timestamp, amount, transaction_type, description FROM transactions ORDER BY timestamp DESC, id DESC LIMIT ?",
-            (count,)
-        )
-        rows = c.fetchall()
-        conn.close()
+        with reader_connection() as conn:
+            rows = conn.execute(
+                f"SELECT id, {LOCAL_TIMESTAMP_SQL}, amount, transaction_type, description FROM transactions ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (count,)
+            ).fetchall()
         return [
             {
                 "id": row[0], "date": row[1], "amount": row[2],
@@ -164,23 +150,17 @@ def clean_specific_entries(entry_ids):
         return result
 
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-
-        # Create placeholders for the IN clause
-        placeholders = ','.join(['?'] * len(entry_ids))
-
-        # Get count before delete
-        c.execute(f"SELECT COUNT(*) FROM transactions WHERE id IN ({placeholders})", entry_ids)
-        count_before = c.fetchone()[0]
-
-        # Delete the entries
-        c.execute(f"DELETE FROM transactions WHERE id IN ({placeholders})", entry_ids)
-        conn.commit()
+        # One prepared statement run per ID inside a single transaction; no
+        # per-length IN (...) SQL and no bound-parameter limit
+        with writer_connection() as conn:
+            deleted = conn.executemany(
+                "DELETE FROM transactions WHERE id = ?",
+                ((entry_id,) for entry_id in entry_ids)
+            ).rowcount
+        notify_data_changed()
 
         result["success"] = True
-        result["deleted_count"] = count_before
-        conn.close()
+        result["deleted_count"] = deleted
         return result
 
     except Exception as e:
@@ -202,48 +182,15 @@ def delete_single_transaction(transaction_id):
             "error": str or None
         }
     """
-    result = {
-        "success": False,
-        "amount": 0.0,
-        "transaction_type": None,
-        "error": None
-    }
-    
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        # Get the transaction details first
-        c.execute('SELECT amount, transaction_type FROM transactions WHERE id = ?', (transaction_id,))
-        row = c.fetchone()
-        
-        if not row:
-            result["error"] = "Transaction not found"
-            return result
-        
-        amount, transaction_type = row
-        
-        # Adjust balance based on transaction type
-        if transaction_type == 'walk':
-            # Remove walk amount from balance
-            c.execute('UPDATE balance SET current_balance = current_balance - ? WHERE id = 1', (amount,))
-        elif transaction_type in ('payment', 'credit_given'):
-            # These were negative, so we add back to balance
-            c.execute('UPDATE balance SET current_balance = current_balance + ? WHERE id = 1', (abs(amount),))
-        elif transaction_type == 'initial_balance':
-            # Remove initial balance from balance
-            c.execute('UPDATE balance SET current_balance = current_balance - ? WHERE id = 1', (amount,))
-        
-        # Delete the transaction
-        c.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
-        conn.commit()
-        
-        result["success"] = True
-        result["amount"] = amount
-        result["transaction_type"] = transaction_type
-        conn.close()
-        return result
-        
-    except Exception as e:
-        result["error"] = str(e)
-        return result
\ No newline at end of file
+    # Same operation as database.delete_transaction_by_id; delegate so there
+    # is one implementation using the shared writer connection
+    return delete_transaction_by_id(transaction_id)
+
+# --- Async wrappers ---
+# Same idiom as database.py: the blocking SQLite work runs on a worker thread
+# so the Telegram event loop stays responsive.
+
+clean_detailed_report_async = _in_thread(clean_detailed_report)
+get_report_entries_async = _in_thread(get_report_entries)
+get_recent_entries_async = _in_thread(get_recent_entries)
+clean_specific_entries_async = _in_thread(clean_specific_entries)